@@ -1,8 +1,23 @@
-try:
-    from . import debugtools
-    from . import runtimetools
-except ImportError:
-    import os, sys
-    sys.path.append(os.path.dirname(__file__))
-    import debugtools
-    import runtimetools
+## submodules are only imported on first access (PEP 562), so `import sbNative` stays cheap
+__all__ = ["debugtools", "runtimetools", "geometrics", "productiontools"]
+
+
+def __getattr__(name):
+    if name not in __all__:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    import importlib
+    try:
+        module = importlib.import_module(f".{name}", __name__)
+    except ImportError:
+        ## loaded straight from its file location, not as an importable package
+        import os, sys
+        sys.path.append(os.path.dirname(__file__))
+        module = importlib.import_module(name)
+
+    globals()[name] = module
+    return module
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -1,17 +1,29 @@
-import inspect
+from __future__ import annotations
+
 import os
-import shutil
 import sys
 import time
-import atexit
-import typing
-import itertools
 from enum import Enum
 try:
-    from .runtimetools import get_path
+    from .runtimetools import LazyModule, get_path
 except ImportError:
-    from runtimetools import get_path
-import webbrowser
+    from runtimetools import LazyModule, get_path
+
+## heavier standard library modules (inspect, shutil, webbrowser, ...) are imported inside the functions needing them,
+## so importing this module stays cheap. `typing` (which pulls in `re`) is only needed for the annotations, which
+## still resolve through the `LazyModule` stand-in.
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    import typing
+else:
+    typing = LazyModule("typing")
+
+__all__ = [
+    "INDENT_LVL", "terminal_stacking", "line_split_sign", "prev_log_info", "prev_log", "switch_terminal_stacking",
+    "format_dict_to_equal_signs", "compute_line_break_indents", "CallSiteLimit", "call_site_limits", "log", "ilog",
+    "ClsWithCleanRepr", "is_from_call", "clean_repr", "get_terminal_outputs", "plot_tuples", "timer", "line_timings",
+    "measure_line_timer_overhead", "line_timer", "get_path", "TPlotArgs", "TimePlotter"
+]
 
 
 INDENT_LVL: int = 4
@@ -42,6 +54,8 @@ def switch_terminal_stacking() -> bool:
     not be printed again,
     it will rather "edit" the existing line and add `[2x]` `[3x]` `[4x]` ... `[nx]` after the location of the log.
     """
+    import atexit
+
     global terminal_stacking
     terminal_stacking = not terminal_stacking
     if not terminal_stacking:
@@ -117,6 +131,9 @@ def __base_logging_func(
     like `log` and `ilog` (info-log). It is almost redundant to use this,
     because the `log` and `ilog` functions will likely satisfy your needs.
     """
+    import inspect
+    import shutil
+
     global terminal_stacking
 
     call = inspect.getframeinfo(inspect.stack()[traceback_depth][0])
@@ -171,20 +188,103 @@ def __base_logging_func(
         print(log_string)
 
 
-def log(*args: object, depth: int = 2, **kwargs) -> None:
+class CallSiteLimit:
+    """The state of the rate limiting and sampling of one call site of `log`, `ilog` or `timer`."""
+    __slots__ = ("calls", "suppressed", "tokens", "last_refill")
+
+    def __init__(self):
+        self.calls = 0
+        self.suppressed = 0
+        self.tokens = None
+        self.last_refill = time.monotonic()
+
+    @staticmethod
+    def check_options(rate_limit: float = None, sample_every: int = None, first_calls: int = None) -> None:
+        for name, value in (("rate_limit", rate_limit), ("sample_every", sample_every), ("first_calls", first_calls)):
+            if value is not None and value <= 0:
+                raise ValueError(f"{name} has to be positive, got {value!r}")
+
+    def allows(self, rate_limit: float = None, sample_every: int = None, first_calls: int = None) -> bool:
+        self.check_options(rate_limit, sample_every, first_calls)
+        self.calls += 1
+        allowed = ((first_calls is None or self.calls <= first_calls) and
+                   (sample_every is None or (self.calls - 1) % sample_every == 0))
+
+        if allowed and rate_limit is not None:
+            ## token bucket holding up to `rate_limit` logs, refilled with `rate_limit` logs per second
+            now = time.monotonic()
+            capacity = max(rate_limit, 1)
+            if self.tokens is None:
+                self.tokens = capacity
+            self.tokens = min(capacity, self.tokens + (now - self.last_refill) * rate_limit)
+            self.last_refill = now
+            allowed = self.tokens >= 1
+            if allowed:
+                self.tokens -= 1
+
+        if not allowed:
+            self.suppressed += 1
+        return allowed
+
+
+call_site_limits: typing.Dict[typing.Tuple[str, int], CallSiteLimit] = {}
+
+
+def _print_suppressed_logs():
+    for (file_name, line_number), limit in call_site_limits.items():
+        if limit.suppressed:
+            path = file_name.replace("\\", "/") + ":" + str(line_number)
+            print(f"LOG: {limit.suppressed} more calls suppressed --> {path}")
+
+
+def _limit_call_site(depth: int, rate_limit: float, sample_every: int, first_calls: int) -> typing.Optional[str]:
+    """Checks the limits of the call site `depth` frames above the logging function, before anything is formatted.
+    Returns `None` if the log is suppressed, otherwise what to add to its end."""
+    frame = sys._getframe(depth)
+    call_site = (frame.f_code.co_filename, frame.f_lineno)
+
+    limit = call_site_limits.get(call_site)
+    if limit is None:
+        if not call_site_limits:
+            import atexit
+            atexit.register(_print_suppressed_logs)
+        limit = call_site_limits[call_site] = CallSiteLimit()
+
+    if not limit.allows(rate_limit, sample_every, first_calls):
+        return None
+    suppressed, limit.suppressed = limit.suppressed, 0
+    return f" [{suppressed} suppressed]" if suppressed else ""
+
+
+def log(*args: object, depth: int = 2, rate_limit: float = None, sample_every: int = None, first_calls: int = None,
+        **kwargs) -> None:
     """
     Prints all the arguments given to the console and the file + line of the call.
     Supports more advanced logging when paired with the `cleanRepr` class decorator.
+    `rate_limit` (logs per second), `sample_every` (log 1 in K calls) and `first_calls` (only log the first N calls)
+    limit how often the call site prints. The amount of suppressed calls is shown with the next log or at exit.
     """
-    __base_logging_func(None, depth, .9, "", *args, **kwargs)
+    end = ""
+    if rate_limit is not None or sample_every is not None or first_calls is not None:
+        end = _limit_call_site(depth, rate_limit, sample_every, first_calls)
+        if end is None:
+            return
+    __base_logging_func(None, depth, .9, end, *args, **kwargs)
 
 
-def ilog(info: object, *args: object, depth: int = 2, end: str = "", **kwargs) -> None:
+def ilog(info: object, *args: object, depth: int = 2, end: str = "", rate_limit: float = None,
+         sample_every: int = None, first_calls: int = None, **kwargs) -> None:
     """
     Prints all the arguments given to the console and the file + line of the call.
     First argument will be used to represent what is logged. Supports more advanced logging when paired with the
     `cleanRepr` class decorator.
+    Takes the same `rate_limit`, `sample_every` and `first_calls` limits as `log`.
     """
+    if rate_limit is not None or sample_every is not None or first_calls is not None:
+        suppressed = _limit_call_site(depth, rate_limit, sample_every, first_calls)
+        if suppressed is None:
+            return
+        end += suppressed
     __base_logging_func(info, depth, .9, end, *args, **kwargs)
 
 
@@ -238,6 +338,8 @@ def is_from_call(func_name: str) -> bool:
     Used by `__clsRepr` to determine if it should add markers in the form of `lignSplitSign` where newlines can be added
      if the logging string is too long.
     """
+    import inspect
+
     funcs = [c.function for c in inspect.stack()]
     return func_name in funcs
 
@@ -276,6 +378,8 @@ def get_terminal_outputs(func: typing.Callable, *args, **kwargs) -> typing.Tuple
 
 
 def plot_tuples(plt, tpls, title="", x_axis_name="", y_axis_name="") -> None:
+    import itertools
+
     vals_old = list(zip(*tpls))
 
     vals = [tuple([str(i) if type(i) not in [str, int, float]
@@ -297,27 +401,241 @@ def plot_tuples(plt, tpls, title="", x_axis_name="", y_axis_name="") -> None:
     plt.ylabel(y_axis_name)
 
 
-def timer(func: callable) -> typing.Callable:
+def timer(func: callable = None, *, rate_limit: float = None, sample_every: int = None,
+          first_calls: int = None) -> typing.Callable:
     """
     A simple decorator for timing the execution time of a function or method. Flexes the `ilog` function.
+    Use it as `@timer(rate_limit=..., sample_every=..., first_calls=...)` to limit the logs like with `log`.
     """
+    CallSiteLimit.check_options(rate_limit, sample_every, first_calls)
+    if func is None:
+        return lambda f: timer(f, rate_limit=rate_limit, sample_every=sample_every, first_calls=first_calls)
+
     def wrapper(*args, **kwargs):
         begin = time.time()
         ret = func(*args, **kwargs)
         ilog(f"Executing `{func.__name__}` took",
-             time.time() - begin, depth=3, end=" seconds")
+             time.time() - begin, depth=3, end=" seconds", rate_limit=rate_limit, sample_every=sample_every,
+             first_calls=first_calls)
         return ret
 
     return wrapper
 
 
+class _LineTimings:
+    """Per line hit counts and cumulative `perf_counter_ns` of the code objects decorated with `line_timer`. The time
+    between two line events of a frame is added to the earlier line, so the time spent in callees counts for the line
+    calling them."""
+    MONITORING_TOOL_NAME = "sbNative.line_timer"
+    ## ids 0-2 and 5 are reserved for debuggers, coverage tools, profilers (like `cProfile`) and optimizers
+    MONITORING_TOOL_IDS = (3, 4)
+
+    def __init__(self):
+        self.codes = {}  # code -> {line_number: [hits, ns]}
+        self.pending = {}  # frame -> [code, line_number, start_ns]
+        self.monitoring_tool = None
+
+    def line_event(self, frame, code, line_number):
+        now = time.perf_counter_ns()
+        lines = self.codes[code]
+        state = self.pending.get(frame)
+        if state is not None:
+            lines[state[1]][1] += now - state[2]
+        else:
+            state = self.pending[frame] = [code, line_number, 0]
+
+        line = lines.get(line_number)
+        if line is None:
+            line = lines[line_number] = [0, 0]
+        line[0] += 1
+        state[1] = line_number
+        ## the bookkeeping above is left out of the measured time
+        state[2] = time.perf_counter_ns()
+
+    def return_event(self, frame):
+        now = time.perf_counter_ns()
+        state = self.pending.pop(frame, None)
+        if state is not None:
+            self.codes[state[0]][state[1]][1] += now - state[2]
+
+    def flush_unwound_frames(self):
+        """Closes the frames left by exceptions, `sys.monitoring` has no local event for them."""
+        alive = set()
+        frame = sys._getframe()
+        while frame is not None:
+            alive.add(frame)
+            frame = frame.f_back
+        for frame in [f for f in self.pending if f not in alive]:
+            self.return_event(frame)
+
+    def _settrace_local(self, previous):
+        def trace_local(frame, event, arg):
+            nonlocal previous
+            if previous is not None:
+                previous = previous(frame, event, arg)
+            if event == "line":
+                self.line_event(frame, frame.f_code, frame.f_lineno)
+            elif event == "return":
+                self.return_event(frame)
+            return trace_local
+        return trace_local
+
+    def settrace_global(self, previous=None):
+        """A `sys.settrace` function timing the frames of the decorated code objects. Every event is passed on to the
+        `previous` trace function as well, so a debugger or coverage tool keeps working."""
+        def trace_global(frame, event, arg):
+            local = previous(frame, event, arg) if previous is not None else None
+            if frame.f_code in self.codes:
+                return self._settrace_local(local)
+            return local
+        trace_global.line_timings = self
+        return trace_global
+
+    def _monitoring_line(self, code, line_number):
+        self.line_event(sys._getframe(1), code, line_number)
+
+    def _monitoring_return(self, code, instruction_offset, retval):
+        self.return_event(sys._getframe(1))
+
+    def use_monitoring(self, code) -> bool:
+        """Enables the LINE, PY_RETURN and PY_YIELD events of `sys.monitoring` (3.12+) for `code` only. Returns False
+        if `sys.monitoring` is not available or both tool ids not reserved for debuggers, coverage, profilers and
+        optimizers (3 and 4) are taken."""
+        monitoring = getattr(sys, "monitoring", None)
+        if monitoring is None:
+            return False
+        if self.monitoring_tool is None:
+            tool = next((t for t in self.MONITORING_TOOL_IDS if monitoring.get_tool(t) is None), None)
+            if tool is None:
+                return False
+            monitoring.use_tool_id(tool, self.MONITORING_TOOL_NAME)
+            monitoring.register_callback(tool, monitoring.events.LINE, self._monitoring_line)
+            monitoring.register_callback(tool, monitoring.events.PY_RETURN, self._monitoring_return)
+            monitoring.register_callback(tool, monitoring.events.PY_YIELD, self._monitoring_return)
+            self.monitoring_tool = tool
+
+        events = monitoring.events
+        monitoring.set_local_events(self.monitoring_tool, code, events.LINE | events.PY_RETURN | events.PY_YIELD)
+        return True
+
+    def forget(self, code) -> None:
+        """Stops timing `code` and drops its timings."""
+        if self.monitoring_tool is not None:
+            sys.monitoring.set_local_events(self.monitoring_tool, code, 0)
+        self.codes.pop(code, None)
+
+
+line_timings = _LineTimings()
+
+_line_timer_overhead_ns = {}
+
+
+def _line_timer_overhead_probe(n):
+    total = 0
+    for i in range(n):
+        total += i
+    return total
+
+
+def measure_line_timer_overhead(backend: str = None, iterations: int = 20_000) -> float:
+    """Estimates how many nanoseconds the tracing of `line_timer` adds per executed line, by running a small loop with
+    and without it. The traced run uses a fresh copy of the loop's code object, which is forgotten again afterwards, so
+    the untraced run of later measurements stays untraced."""
+    import types
+
+    begin = time.perf_counter_ns()
+    _line_timer_overhead_probe(iterations)
+    untraced = time.perf_counter_ns() - begin
+
+    code = _line_timer_overhead_probe.__code__.replace()
+    probe = line_timer(types.FunctionType(code, globals()), backend=backend, report_at_exit=False)
+    try:
+        begin = time.perf_counter_ns()
+        probe(iterations)
+        traced = time.perf_counter_ns() - begin
+        events = sum(hits for hits, _ in probe.line_timings.values())
+    finally:
+        line_timings.forget(code)
+    return max(traced - untraced, 0) / max(events, 1)
+
+
+def line_timer(func: callable = None, *, top: int = 10, backend: str = None,
+               report_at_exit=True) -> typing.Callable:
+    """
+    A decorator collecting the hit count and cumulative time of every line of a function, to find out which line makes
+    it slow. Uses `sys.monitoring` LINE events on python 3.12+ and falls back to `sys.settrace`, tracing only the
+    decorated function. `backend` may force `"monitoring"` or `"settrace"`. With `sys.settrace`, generators are only
+    traced while they are iterated inside a call of the decorated function.
+    The hottest `top` lines are printed at exit (or with `.report()`) in the `--> file:line` format of `log`, together
+    with the measured tracing overhead.
+    """
+    if func is None:
+        return lambda f: line_timer(f, top=top, backend=backend, report_at_exit=report_at_exit)
+    if backend not in (None, "monitoring", "settrace"):
+        raise ValueError(f"{backend!r} is not a line_timer backend, use 'monitoring' or 'settrace'")
+
+    import functools
+
+    code = func.__code__
+    lines = line_timings.codes.setdefault(code, {})
+    uses_monitoring = backend != "settrace" and line_timings.use_monitoring(code)
+    if backend == "monitoring" and not uses_monitoring:
+        raise RuntimeError("sys.monitoring is not available or its free tool ids 3 and 4 are already in use")
+    calls = [0]
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        calls[0] += 1
+        if calls[0] == 1 and report_at_exit:
+            import atexit
+            atexit.register(report)
+
+        if uses_monitoring:
+            try:
+                return func(*args, **kwargs)
+            except BaseException:
+                line_timings.flush_unwound_frames()
+                raise
+
+        previous_trace = sys.gettrace()
+        if getattr(previous_trace, "line_timings", None) is line_timings:
+            return func(*args, **kwargs)
+        sys.settrace(line_timings.settrace_global(previous_trace))
+        try:
+            return func(*args, **kwargs)
+        finally:
+            sys.settrace(previous_trace)
+
+    def report(top: int = top) -> None:
+        import linecache
+
+        key = "monitoring" if uses_monitoring else "settrace"
+        if key not in _line_timer_overhead_ns:
+            _line_timer_overhead_ns[key] = measure_line_timer_overhead(key)
+        overhead = _line_timer_overhead_ns[key]
+
+        total = sum(ns for _, ns in lines.values())
+        events = sum(hits for hits, _ in lines.values())
+        print(f"LINE TIMER (`{func.__qualname__}`): {calls[0]} calls took {total / 1e6:.3f} ms, tracing added about "
+              f"{overhead:.0f} ns per line ({events * overhead / 1e6:.3f} ms in total, {key})")
+
+        path = code.co_filename.replace("\\", "/")
+        for line_number, (hits, ns) in sorted(lines.items(), key=lambda i: i[1][1], reverse=True)[:top]:
+            source = linecache.getline(code.co_filename, line_number).strip()
+            print(f"    {ns / 1e6:10.3f} ms {100 * ns / (total or 1):5.1f}% {hits:>8}x  {source} --> {path}:{line_number}")
+
+    wrapper.line_timings = lines
+    wrapper.report = report
+    return wrapper
+
+
 class TPlotArgs(Enum):
     TIME = 1
     ARGS = 2
 
 
 class TimePlotter:
-    def __init__(self, sort_after: typing.Union[TPlotArgs, TPlotArgs], track_args: typing.Sequence[int] = None,
+    def __init__(self, sort_after: TPlotArgs, track_args: typing.Sequence[int] = None,
                  track_kwargs: typing.Sequence[str] = None, reverse=False):
         if track_args is None:
             track_args = []
@@ -406,6 +724,8 @@ class TimePlotter:
 
     @staticmethod
     def display_graph(html_content):
+        import webbrowser
+
         with open(f"{str(get_path())}/temp/graphdisplay.html", 'w') as f:
             f.write(html_content)
 
@@ -1,25 +1,521 @@
 import math
-import itertools
+import heapq
+import mmap
+import operator
 import string
+import struct
+import sys
+from array import array
+
+_numpy_module = None
+
+## magic, format version, dimension, amount of points. The packed little endian float64 coordinates follow, 8 byte
+## aligned
+POINT_FILE_MAGIC = b"SBPT"
+POINT_FILE_VERSION = 1
+_point_file_header = struct.Struct("<4sHxxQQ")
+
+## dimension -> axis names and dimension -> {axis name: index}, filled once per dimension by `Point.axis_names` and
+## `Point.axis_indices` and read directly on attribute access
+_axis_names = {}
+_axis_indices = {}
 
 
 class Point:
+    """A point with any amount of dimensions. The coordinates are stored as float64 values in a single `array('d')`
+    (or any other buffer of doubles, see `from_buffer`) instead of one instance attribute per axis. They are still
+    reachable by their axis names (`x`, `y`, `z`, `w` and `ax`, `bx`, ... / `a0x`, ... for 5 or more dimensions)."""
+    __slots__ = ("_values",)
+
     def __init__(self, *values):
-        for n, v in self.pair_axis_names_to_values(values):
-            self.__setattr__(n, v)
+        object.__setattr__(self, "_values", array("d", values))
+
+    @classmethod
+    def from_buffer(cls, values) -> "Point":
+        """Wraps a sequence of doubles, like an `array('d')` or a memoryview cast to `'d'`, without copying it. Changes
+        to the point are written to the buffer and the other way around."""
+        point = cls.__new__(cls)
+        object.__setattr__(point, "_values", values)
+        return point
+
+    @staticmethod
+    def axis_names(dimension: int) -> tuple:
+        """The axis names of a point with `dimension` values, computed once per dimension. Up to 4 dimensions these are
+        `x`, `y`, `z`, `w`. Up to 68 they are `ax` ... `wx`, `ay` ... `wz`. From 69 on, the number of the block of 23
+        is put in between: `a0x` ... `w0x`, `a1y` ... `w2z`, `a3x` ..."""
+        names = _axis_names.get(dimension)
+        if names is not None:
+            return names
+
+        prefixes = string.ascii_lowercase[:-3]
+        if dimension < 5:
+            names = tuple("xyzw"[:dimension])
+        elif dimension < 3 * len(prefixes):
+            names = tuple(prefix+suffix for suffix in "xyz" for prefix in prefixes)[:dimension]
+        else:
+            names = tuple(f"{prefixes[i % 23]}{i // 23}{'xyz'[i // 23 % 3]}" for i in range(dimension))
+        _axis_names[dimension] = names
+        return names
+
+    @staticmethod
+    def axis_indices(dimension: int) -> dict:
+        """Maps the axis names of a point with `dimension` values to their index, computed once per dimension."""
+        indices = _axis_indices.get(dimension)
+        if indices is None:
+            indices = _axis_indices[dimension] = {name: idx for idx, name in enumerate(Point.axis_names(dimension))}
+        return indices
 
     @staticmethod
     def pair_axis_names_to_values(values):
-        if len(values) < 5:
-            axis = "xyzw"
+        names = _axis_names.get(len(values)) or Point.axis_names(len(values))
+        return zip(names, values)
+
+    def _axis_index(self, name):
+        dimension = len(self._values)
+        indices = _axis_indices.get(dimension)
+        if indices is None:
+            indices = self.axis_indices(dimension)
+        idx = indices.get(name)
+        if idx is None:
+            raise AttributeError(f"{type(self).__name__!r} object has no attribute {name!r}")
+        return idx
+
+    def __getattr__(self, name):
+        if name.startswith("__") or name == "_values":
+            raise AttributeError(f"{type(self).__name__!r} object has no attribute {name!r}")
+        return self._values[self._axis_index(name)]
+
+    def __setattr__(self, name, value):
+        if name == "_values":
+            raise AttributeError(f"{name!r} of {type(self).__name__!r} is read-only")
+        self._values[self._axis_index(name)] = value
+
+    def __len__(self):
+        return len(self._values)
+
+    def __iter__(self):
+        return iter(self._values)
+
+    def __getitem__(self, idx):
+        return self._values[idx]
+
+    def __repr__(self):
+        return f"{type(self).__name__}({', '.join(map(repr, self._values))})"
+
+    def __reduce__(self):
+        return type(self), tuple(self._values)
+
+    def _check_dimension(self, other):
+        if len(self._values) != len(other):
+            raise ValueError(f"Can not combine points with {len(self._values)} and {len(other)} dimensions")
+
+    def __add__(self, other):
+        self._check_dimension(other)
+        return type(self).from_buffer(array("d", map(operator.add, self._values, other)))
+
+    def __sub__(self, other):
+        self._check_dimension(other)
+        return type(self).from_buffer(array("d", map(operator.sub, self._values, other)))
+
+    def __neg__(self):
+        return type(self).from_buffer(array("d", map(operator.neg, self._values)))
+
+    def scale(self, factor: float) -> "Point":
+        return type(self).from_buffer(array("d", map(float(factor).__mul__, self._values)))
+
+    def __mul__(self, factor):
+        if not isinstance(factor, (int, float)):
+            return NotImplemented
+        return self.scale(factor)
+
+    __rmul__ = __mul__
+
+    def __truediv__(self, divisor):
+        if not isinstance(divisor, (int, float)):
+            return NotImplemented
+        return self.scale(1 / divisor)
+
+    def dot(self, other) -> float:
+        self._check_dimension(other)
+        return sum(map(operator.mul, self._values, other))
+
+    def norm(self) -> float:
+        return math.hypot(*self._values)
+
+    def distance(self, other) -> float:
+        self._check_dimension(other)
+        return math.dist(self._values, other)
+
+
+def _low_dimension_axis(idx: int) -> property:
+    def get(point):
+        values = point._values
+        if idx < len(values) < 5:
+            return values[idx]
+        ## not an axis of this point, `__getattr__` raises the error
+        raise AttributeError
+
+    return property(get)
+
+
+## `x`, `y`, `z` and `w` are read through properties, only the names of 5 or more dimensions go through `__getattr__`
+for _idx, _name in enumerate("xyzw"):
+    setattr(Point, _name, _low_dimension_axis(_idx))
+del _idx, _name
+
+
+def _numpy():
+    """numpy is optional. Without it `PointCloud` works on plain `array('d')` buffers."""
+    global _numpy_module
+    if _numpy_module is None:
+        try:
+            import numpy
+        except ImportError:
+            numpy = False
+        _numpy_module = numpy
+    return _numpy_module or None
+
+
+class PointCloud:
+    """A fixed amount of points with the same dimension, stored row after row in one contiguous buffer of doubles
+    (an `array('d')`, numpy array or any other buffer, see `from_buffer`). Indexing and iterating yield `Point` views
+    into that buffer, nothing is copied. Single axes are available as strided views with `column`.
+    `nearest` and `within_radius` use a KD-tree, which is built on the first query. Call `build_index` again after
+    changing coordinates through the views."""
+    KD_LEAF_SIZE: int = 8
+
+    def __init__(self, points=(), dimension: int = None):
+        numpy = _numpy()
+        if numpy is not None and isinstance(points, numpy.ndarray):
+            points = numpy.ascontiguousarray(points, dtype=numpy.float64)
+            if points.ndim != 2:
+                raise ValueError(f"Expected a 2 dimensional array of points, got {points.ndim} dimensions")
+            self._set_buffer(points, points.shape[1])
+            return
+
+        flat = array("d")
+        for point in points:
+            before = len(flat)
+            flat.extend(point)
+            if dimension is None:
+                dimension = len(flat) - before
+            elif len(flat) - before != dimension:
+                raise ValueError(f"Expected {dimension} coordinates per point, got {len(flat) - before}")
+        self._set_buffer(flat, dimension or 0)
+
+    @classmethod
+    def from_buffer(cls, buffer, dimension: int) -> "PointCloud":
+        """Uses `buffer`, anything exporting C-contiguous doubles or raw bytes holding them, as storage without copying
+        it."""
+        cloud = cls.__new__(cls)
+        cloud._set_buffer(buffer, dimension)
+        return cloud
+
+    def _set_buffer(self, buffer, dimension):
+        coords = memoryview(buffer)
+        if coords.format != "d" and coords.itemsize != 1:
+            raise TypeError(f"A PointCloud needs doubles or raw bytes as buffer, not the format {coords.format!r}")
+        if coords.format != "d" or coords.ndim != 1:
+            ## raw bytes, like a mmap, or a multi-dimensional buffer of doubles
+            coords = coords.cast("B").cast("d")
+        if dimension < 0 or (dimension == 0 and len(coords)) or (dimension and len(coords) % dimension):
+            raise ValueError(f"{len(coords)} coordinates can not be split into points of {dimension} dimensions")
+
+        self._buffer = buffer
+        self._coords = coords
+        self.dimension = dimension
+        self._kd_order = None
+
+    def __len__(self):
+        return len(self._coords) // self.dimension if self.dimension else 0
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            start, stop, step = idx.indices(len(self))
+            if step != 1:
+                raise ValueError("Only contiguous slices of a PointCloud can be viewed")
+            return type(self).from_buffer(self._coords[start*self.dimension:max(start, stop)*self.dimension],
+                                          self.dimension)
+
+        if idx < 0:
+            idx += len(self)
+        if not 0 <= idx < len(self):
+            raise IndexError("PointCloud index out of range")
+        return Point.from_buffer(self._coords[idx*self.dimension:(idx+1)*self.dimension])
+
+    def __iter__(self):
+        coords, dim = self._coords, self.dimension
+        for start in range(0, len(coords), dim or 1):
+            yield Point.from_buffer(coords[start:start+dim])
+
+    def __repr__(self):
+        return f"{type(self).__name__}({len(self)} points, {self.dimension} dimensions)"
+
+    def column(self, axis: int) -> memoryview:
+        """A strided view of one coordinate of every point."""
+        return self._coords[axis::self.dimension]
+
+    def to_numpy(self):
+        """The points as a `(len, dimension)` numpy array sharing this buffer."""
+        numpy = _numpy()
+        if numpy is None:
+            raise ImportError("numpy is required for PointCloud.to_numpy")
+        return numpy.frombuffer(self._coords, dtype=numpy.float64).reshape(-1, self.dimension)
+
+    def _check_dimension(self, values):
+        if len(values) != self.dimension:
+            raise ValueError(f"Expected {self.dimension} values, got {len(values)}")
+
+    def _from_columns(self, columns) -> "PointCloud":
+        flat = array("d", bytes(self._coords.nbytes))
+        for axis, column in enumerate(columns):
+            flat[axis::self.dimension] = column
+        return type(self).from_buffer(flat, self.dimension)
+
+    def bounding_box(self) -> tuple:
+        """The lowest and highest coordinates on every axis, as a tuple of two points."""
+        if not len(self):
+            raise ValueError("An empty PointCloud has no bounding box")
+        numpy = _numpy()
+        if numpy is not None:
+            points = self.to_numpy()
+            return Point(*points.min(axis=0)), Point(*points.max(axis=0))
+        columns = [self.column(axis) for axis in range(self.dimension)]
+        return Point(*map(min, columns)), Point(*map(max, columns))
+
+    def translate(self, offset) -> "PointCloud":
+        offset = tuple(map(float, offset))
+        self._check_dimension(offset)
+        numpy = _numpy()
+        if numpy is not None:
+            return type(self)(self.to_numpy() + offset)
+        return self._from_columns(array("d", map(o.__add__, self.column(axis))) for axis, o in enumerate(offset))
+
+    def scale(self, factor: float) -> "PointCloud":
+        factor = float(factor)
+        numpy = _numpy()
+        if numpy is not None:
+            return type(self)(self.to_numpy() * factor)
+        return type(self).from_buffer(array("d", map(factor.__mul__, self._coords)), self.dimension)
+
+    def transform(self, matrix) -> "PointCloud":
+        """Multiplies every point with a `dimension` x `dimension` matrix, given as a sequence of rows."""
+        matrix = [tuple(map(float, row)) for row in matrix]
+        self._check_dimension(matrix)
+        for row in matrix:
+            self._check_dimension(row)
+
+        numpy = _numpy()
+        if numpy is not None:
+            return type(self)(self.to_numpy() @ numpy.array(matrix).T)
+
+        columns = [self.column(axis) for axis in range(self.dimension)]
+        new_columns = []
+        for row in matrix:
+            new_column = array("d", bytes(8 * len(self)))
+            for factor, column in zip(row, columns):
+                if factor:
+                    new_column = array("d", map(operator.add, new_column, map(factor.__mul__, column)))
+            new_columns.append(new_column)
+        return self._from_columns(new_columns)
+
+    def build_index(self, leaf_size: int = None) -> None:
+        """(Re)builds the KD-tree. It is stored as an order of the point indices, where the median of every range
+        splits it on the axis `depth % dimension`, ranges of at most `leaf_size` points are searched linearly."""
+        leaf_size = max(leaf_size or self.KD_LEAF_SIZE, 1)
+        coords, dim = self._coords, self.dimension
+        numpy = _numpy()
+        if numpy is not None:
+            points = self.to_numpy()
+            order = numpy.arange(len(self))
         else:
-            axis = list(itertools.chain.from_iterable(
-                [[prefix+suffix for prefix in string.ascii_lowercase[:-3]] for suffix in "xyz"]))
-            value_axis_relation = len(values) / len(axis)
-            if value_axis_relation >= 1:
-                axis *= math.ceil(value_axis_relation)
-                for i in range(len(axis)):
-                    middle = int(i/23)
-                    axis[i] = F"{axis[i][0]}{middle}{axis[i][-1]}"
-
-        return zip(axis[:len(values)], values)
+            order = list(range(len(self)))
+
+        stack = [(0, len(self), 0)]
+        while stack:
+            lo, hi, axis = stack.pop()
+            if hi - lo <= leaf_size:
+                continue
+            mid = (lo + hi) // 2
+            if numpy is not None:
+                sub_order = order[lo:hi]
+                order[lo:hi] = sub_order[numpy.argpartition(points[sub_order, axis], mid - lo)]
+            else:
+                order[lo:hi] = sorted(order[lo:hi], key=lambda i: coords[i*dim + axis])
+            next_axis = (axis + 1) % dim
+            stack.append((lo, mid, next_axis))
+            stack.append((mid + 1, hi, next_axis))
+
+        self._kd_order = order.tolist() if numpy is not None else order
+        self._kd_leaf_size = leaf_size
+
+    def _query_target(self, point) -> tuple:
+        target = tuple(map(float, point))
+        self._check_dimension(target)
+        if self._kd_order is None:
+            self.build_index()
+        return target
+
+    def nearest(self, point, k: int = 1) -> list:
+        """The `k` points closest to `point` as `(distance, index)` tuples, closest first."""
+        target = self._query_target(point)
+        coords, dim, order, leaf_size = self._coords, self.dimension, self._kd_order, self._kd_leaf_size
+        best = []  # max heap of (-distance, index)
+
+        def consider(idx):
+            distance = math.dist(target, coords[idx*dim:(idx+1)*dim])
+            if len(best) < k:
+                heapq.heappush(best, (-distance, idx))
+            elif distance < -best[0][0]:
+                heapq.heapreplace(best, (-distance, idx))
+
+        stack = [(0, len(order), 0, 0.0)] if k > 0 else []
+        while stack:
+            lo, hi, axis, bound = stack.pop()
+            if len(best) == k and bound >= -best[0][0]:
+                continue
+            if hi - lo <= leaf_size:
+                for idx in order[lo:hi]:
+                    consider(idx)
+                continue
+
+            mid = (lo + hi) // 2
+            consider(order[mid])
+            diff = target[axis] - coords[order[mid]*dim + axis]
+            next_axis = (axis + 1) % dim
+            near, far = ((lo, mid), (mid + 1, hi)) if diff < 0 else ((mid + 1, hi), (lo, mid))
+            stack.append((*far, next_axis, max(bound, abs(diff))))
+            stack.append((*near, next_axis, bound))
+
+        return sorted((-negative_distance, idx) for negative_distance, idx in best)
+
+    def within_radius(self, point, radius: float) -> list:
+        """The indices of all points at most `radius` away from `point`."""
+        target = self._query_target(point)
+        coords, dim, order, leaf_size = self._coords, self.dimension, self._kd_order, self._kd_leaf_size
+        found = []
+
+        stack = [(0, len(order), 0)]
+        while stack:
+            lo, hi, axis = stack.pop()
+            if hi - lo <= leaf_size:
+                found.extend(idx for idx in order[lo:hi]
+                             if math.dist(target, coords[idx*dim:(idx+1)*dim]) <= radius)
+                continue
+
+            mid = (lo + hi) // 2
+            idx = order[mid]
+            if math.dist(target, coords[idx*dim:(idx+1)*dim]) <= radius:
+                found.append(idx)
+            diff = target[axis] - coords[idx*dim + axis]
+            next_axis = (axis + 1) % dim
+            if diff <= radius:
+                stack.append((lo, mid, next_axis))
+            if -diff <= radius:
+                stack.append((mid + 1, hi, next_axis))
+        return found
+
+    def _little_endian_coords(self) -> memoryview:
+        if sys.byteorder == "little":
+            return self._coords
+        swapped = array("d", self._coords)
+        swapped.byteswap()
+        return memoryview(swapped)
+
+    def save(self, path) -> None:
+        """Writes the points to a binary point file, a small header followed by the raw coordinates of the buffer."""
+        with open(path, "wb") as f:
+            f.write(_point_file_header.pack(POINT_FILE_MAGIC, POINT_FILE_VERSION, self.dimension, len(self)))
+            f.write(self._little_endian_coords())
+
+    def append_to(self, path) -> None:
+        """Appends the points to an existing point file with the same dimension (or without any points yet)."""
+        with open(path, "r+b") as f:
+            dimension, count = _read_point_file_header(f, path)
+            if count and dimension != self.dimension:
+                raise ValueError(f"Can not append points of {self.dimension} dimensions to {path}, which contains "
+                                 f"points of {dimension} dimensions")
+
+            f.seek(_point_file_header.size + count * dimension * 8)
+            f.write(self._little_endian_coords())
+            f.truncate()
+            ## the count is only updated once all the coordinates are written
+            f.seek(0)
+            f.write(_point_file_header.pack(POINT_FILE_MAGIC, POINT_FILE_VERSION, self.dimension, count + len(self)))
+
+    @classmethod
+    def load(cls, path, writable=False) -> "PointCloud":
+        """Memory maps a point file written by `save`. Nothing is read up front, the points are views into the mapped
+        file. With `writable`, changes to the points are written to the file."""
+        with open(path, "r+b" if writable else "rb") as f:
+            dimension, count = _read_point_file_header(f, path)
+            size = count * dimension * 8
+            if f.seek(0, 2) < _point_file_header.size + size:
+                raise ValueError(f"{path} is truncated, expected {count} points of {dimension} dimensions")
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_WRITE if writable else mmap.ACCESS_READ)
+
+        coords = memoryview(mapped)[_point_file_header.size:_point_file_header.size + size]
+        if sys.byteorder != "little":
+            coords = array("d", coords.cast("d"))
+            coords.byteswap()
+        return cls.from_buffer(coords, dimension)
+
+
+def _read_point_file_header(f, path) -> tuple:
+    header = f.read(_point_file_header.size)
+    if len(header) < _point_file_header.size:
+        raise ValueError(f"{path} is not a point file")
+    magic, version, dimension, count = _point_file_header.unpack(header)
+    if magic != POINT_FILE_MAGIC:
+        raise ValueError(f"{path} is not a point file")
+    if version != POINT_FILE_VERSION:
+        raise ValueError(f"{path} has the unsupported point file version {version}")
+    return dimension, count
+
+
+if __name__ == "__main__":
+    import itertools
+    import time
+
+    class ChainedNamesPoint:
+        """The former `Point`, rebuilding the axis names with `itertools.chain` and f-strings for every point and
+        keeping one instance attribute per axis."""
+        def __init__(self, *values):
+            for n, v in self.pair_axis_names_to_values(values):
+                self.__setattr__(n, v)
+
+        @staticmethod
+        def pair_axis_names_to_values(values):
+            if len(values) < 5:
+                axis = "xyzw"
+            else:
+                axis = list(itertools.chain.from_iterable(
+                    [[prefix+suffix for prefix in string.ascii_lowercase[:-3]] for suffix in "xyz"]))
+                value_axis_relation = len(values) / len(axis)
+                if value_axis_relation >= 1:
+                    axis *= math.ceil(value_axis_relation)
+                    for i in range(len(axis)):
+                        middle = int(i/23)
+                        axis[i] = F"{axis[i][0]}{middle}{axis[i][-1]}"
+
+            return zip(axis[:len(values)], values)
+
+    for dimension in (3, 30, 300):
+        values = tuple(map(float, range(dimension)))
+        last_axis = Point.axis_names(dimension)[-1]
+
+        timings = {}
+        for cls in (ChainedNamesPoint, Point):
+            begin = time.perf_counter()
+            points = [cls(*values) for _ in range(10 ** 5)]
+            constructed = time.perf_counter() - begin
+
+            begin = time.perf_counter()
+            for point in points:
+                getattr(point, last_axis)
+            timings[cls] = constructed, time.perf_counter() - begin
+
+        (old_constructed, old_accessed), (constructed, accessed) = timings[ChainedNamesPoint], timings[Point]
+        print(f"{dimension:>3} dimensions: constructing 10^5 points took {constructed:.3f}s "
+              f"({old_constructed / constructed:.1f}x faster than with the chained names), "
+              f"reading `{last_axis}` of each took {accessed:.3f}s ({old_accessed:.3f}s from instance attributes)")
@@ -0,0 +1,258 @@
+import ast
+import importlib.machinery
+import importlib.util
+import marshal
+import sys
+import typing
+import zlib
+
+STRIPPED_FUNCTIONS = ("log", "ilog", "timer")
+
+## raise whenever `DebugCallStripper` changes its output, so bytecode cached by an older version is not used anymore
+STRIPPER_VERSION = 2
+
+## bytecode of stripped modules is cached next to the regular one, as `module.cpython-3XX.opt-nodebug<hash>.pyc`
+BYTECODE_OPTIMIZATION_TAG = "nodebug"
+
+
+def bytecode_optimization_tag() -> str:
+    """`BYTECODE_OPTIMIZATION_TAG` followed by a hash of `STRIPPED_FUNCTIONS` and `STRIPPER_VERSION`, so changing
+    either of them does not load bytecode stripped differently."""
+    fingerprint = zlib.crc32(repr((STRIPPER_VERSION, STRIPPED_FUNCTIONS)).encode())
+    return f"{BYTECODE_OPTIMIZATION_TAG}{fingerprint:08x}"
+
+
+def _dotted_name(node: ast.AST) -> typing.Optional[str]:
+    parts = []
+    while isinstance(node, ast.Attribute):
+        parts.append(node.attr)
+        node = node.value
+    if not isinstance(node, ast.Name):
+        return None
+    parts.append(node.id)
+    return ".".join(reversed(parts))
+
+
+_MATCH_CAPTURES = tuple(getattr(ast, n) for n in ("MatchAs", "MatchStar", "MatchMapping") if hasattr(ast, n))
+
+
+def _imported_debug_names(node: typing.Union[ast.Import, ast.ImportFrom], alias: ast.alias) -> typing.Dict[str, str]:
+    """The (dotted) names one alias of an import makes `log`, `ilog` and `timer` reachable by, mapped to the name of
+    the function, like `{"dt.log": "log", ...}` for `import sbNative.debugtools as dt`."""
+    name = alias.asname or alias.name
+    if isinstance(node, ast.ImportFrom):
+        if (node.module or "").split(".")[-1] == "debugtools":
+            if alias.name == "*":
+                return {f: f for f in STRIPPED_FUNCTIONS}
+            return {name: alias.name} if alias.name in STRIPPED_FUNCTIONS else {}
+        if alias.name == "debugtools":
+            return {f"{name}.{f}": f for f in STRIPPED_FUNCTIONS}
+    elif alias.name.split(".")[-1] == "debugtools":
+        return {f"{name}.{f}": f for f in STRIPPED_FUNCTIONS}
+    elif alias.name == "sbNative":
+        return {f"{name}.debugtools.{f}": f for f in STRIPPED_FUNCTIONS}
+    return {}
+
+
+def _bound_names(tree: ast.Module) -> typing.Set[str]:
+    """The names the module binds itself anywhere, by assignments, definitions, parameters or imports other than the
+    ones of `debugtools`."""
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Name) and not isinstance(node.ctx, ast.Load):
+            names.add(node.id)
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            names.add(node.name)
+        elif isinstance(node, ast.arg):
+            names.add(node.arg)
+        elif isinstance(node, (ast.Import, ast.ImportFrom)):
+            for alias in node.names:
+                if alias.name == "*" or _imported_debug_names(node, alias):
+                    continue
+                ## `import sbNative.runtimetools` binds the same `sbNative` module as `import sbNative` does
+                if isinstance(node, ast.Import) and not alias.asname and alias.name.split(".")[0] == "sbNative":
+                    continue
+                names.add((alias.asname or alias.name).split(".")[0])
+        elif isinstance(node, (ast.ExceptHandler, *_MATCH_CAPTURES)):
+            names.update(name for name in (getattr(node, "name", None), getattr(node, "rest", None)) if name)
+    return names
+
+
+def debug_call_names(tree: ast.Module) -> typing.Dict[str, str]:
+    """Collects the (dotted) names `debugtools.log`, `ilog` and `timer` are reachable by in the module, following its
+    imports like `from sbNative.debugtools import log as l` or `import sbNative.debugtools as dt`, mapped to the name
+    of the function. Names the module binds itself anywhere else as well, like with `from math import log` or a
+    parameter called `log`, are left out, as the stripper can not tell which calls are the ones of `debugtools`."""
+    names = {}
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.Import, ast.ImportFrom)):
+            for alias in node.names:
+                names.update(_imported_debug_names(node, alias))
+
+    bound = _bound_names(tree) if names else set()
+    return {name: function for name, function in names.items() if name.split(".")[0] not in bound}
+
+
+class DebugCallStripper(ast.NodeTransformer):
+    """Removes calls of `debugtools.log`, `ilog` and `timer` from a module. Call statements are dropped, `log` and
+    `ilog` calls used as a value are replaced with `None` and `timer` decorators are removed. `timer(f)` and
+    `timer(...)(f)` become `f`, a `timer(...)` decorator used as a value becomes one returning the function unchanged.
+    Arguments of removed calls are never evaluated. Blocks left empty get a `pass`."""
+
+    def __init__(self, names: typing.Dict[str, str]):
+        ## (dotted) name -> `log`, `ilog` or `timer`, as returned by `debug_call_names`
+        self.names = dict(names)
+
+    def _stripped_function(self, node: ast.AST) -> typing.Optional[str]:
+        if isinstance(node, ast.Call):
+            return self.names.get(_dotted_name(node.func))
+        return None
+
+    def _is_debug_call(self, node: ast.AST) -> bool:
+        return self._stripped_function(node) is not None
+
+    @staticmethod
+    def _has_unpacking(node: ast.Call) -> bool:
+        return any(isinstance(a, ast.Starred) for a in node.args) or any(kw.arg is None for kw in node.keywords)
+
+    @staticmethod
+    def _timed_function(node: ast.Call) -> typing.Optional[ast.expr]:
+        """The function a `timer(...)` call decorates, None if it only gets the options and returns a decorator."""
+        if node.args:
+            return node.args[0]
+        return next((kw.value for kw in node.keywords if kw.arg == "func"), None)
+
+    def generic_visit(self, node):
+        filled = [field for field in ("body", "orelse", "finalbody") if getattr(node, field, None)]
+        node = super().generic_visit(node)
+        for field in filled:
+            if not getattr(node, field):
+                setattr(node, field, [ast.copy_location(ast.Pass(), node)])
+        return node
+
+    def visit_Expr(self, node):
+        if self._is_debug_call(node.value):
+            return None
+        return self.generic_visit(node)
+
+    def visit_Call(self, node):
+        function = self._stripped_function(node)
+        if function == "timer":
+            ## what `timer(*args)` gets is only known at runtime
+            if self._has_unpacking(node):
+                return self.generic_visit(node)
+            timed = self._timed_function(node)
+            if timed is not None:
+                return self.visit(timed)
+            identity = ast.parse("lambda func: func", mode="eval").body
+            return ast.copy_location(identity, node)
+        if function is not None:
+            return ast.copy_location(ast.Constant(None), node)
+
+        ## `timer(rate_limit=...)(f)`
+        if (self._stripped_function(node.func) == "timer" and not self._has_unpacking(node.func)
+                and self._timed_function(node.func) is None and len(node.args) == 1 and not node.keywords
+                and not self._has_unpacking(node)):
+            return self.visit(node.args[0])
+        return self.generic_visit(node)
+
+    def _strip_decorators(self, node):
+        node.decorator_list = [d for d in node.decorator_list
+                               if _dotted_name(d.func if isinstance(d, ast.Call) else d) not in self.names]
+        return self.generic_visit(node)
+
+    visit_FunctionDef = visit_AsyncFunctionDef = visit_ClassDef = _strip_decorators
+
+
+def strip_debug_calls(tree: ast.Module) -> ast.Module:
+    names = debug_call_names(tree)
+    if not names:
+        return tree
+    return ast.fix_missing_locations(DebugCallStripper(names).visit(tree))
+
+
+class DebugCallStripLoader(importlib.machinery.SourceFileLoader):
+    """Compiles modules with `strip_debug_calls` applied and caches the result in its own `.opt-nodebug<hash>.pyc`
+    file."""
+
+    def source_to_code(self, data, path, *, _optimize=-1):
+        tree = compile(data, path, "exec", ast.PyCF_ONLY_AST, dont_inherit=True, optimize=_optimize)
+        return compile(strip_debug_calls(tree), path, "exec", dont_inherit=True, optimize=_optimize)
+
+    def get_code(self, fullname):
+        source_path = self.get_filename(fullname)
+        bytecode_path = importlib.util.cache_from_source(source_path, optimization=bytecode_optimization_tag())
+        stats = self.path_stats(source_path)
+        header = (importlib.util.MAGIC_NUMBER + (0).to_bytes(4, "little") +
+                  (int(stats["mtime"]) & 0xFFFFFFFF).to_bytes(4, "little") +
+                  (stats["size"] & 0xFFFFFFFF).to_bytes(4, "little"))
+
+        try:
+            data = self.get_data(bytecode_path)
+        except OSError:
+            pass
+        else:
+            if data[:16] == header:
+                return marshal.loads(memoryview(data)[16:])
+
+        code = self.source_to_code(self.get_data(source_path), source_path)
+        if not sys.dont_write_bytecode:
+            try:
+                self.set_data(bytecode_path, header + marshal.dumps(code))
+            except NotImplementedError:
+                pass
+        return code
+
+
+class DebugCallStripFinder:
+    """A `sys.meta_path` finder loading the modules starting with one of `prefixes` through `DebugCallStripLoader`.
+    The module is looked up by the finders after it in `sys.meta_path`, so editable installs and other path hooks are
+    respected. Modules they do not load from a plain source file, like extension modules or modules inside zip files,
+    are imported unchanged."""
+
+    def __init__(self, prefixes: typing.Iterable[str]):
+        self.prefixes = tuple(prefixes)
+
+    def matches(self, fullname: str) -> bool:
+        return any(fullname == prefix or fullname.startswith(prefix + ".") for prefix in self.prefixes)
+
+    def find_spec(self, fullname, path=None, target=None):
+        if not self.matches(fullname):
+            return None
+
+        spec = self._find_original_spec(fullname, path, target)
+        if spec is None or type(spec.loader) is not importlib.machinery.SourceFileLoader:
+            return None
+
+        loader = DebugCallStripLoader(fullname, spec.origin)
+        spec = importlib.util.spec_from_file_location(
+            fullname, spec.origin, loader=loader, submodule_search_locations=spec.submodule_search_locations)
+        spec.cached = importlib.util.cache_from_source(spec.origin, optimization=bytecode_optimization_tag())
+        return spec
+
+    def _find_original_spec(self, fullname, path, target):
+        for finder in sys.meta_path:
+            if isinstance(finder, DebugCallStripFinder) or not hasattr(finder, "find_spec"):
+                continue
+            spec = finder.find_spec(fullname, path, target)
+            if spec is not None:
+                return spec
+        return None
+
+    def invalidate_caches(self):
+        pass
+
+
+def install_debug_call_stripper(*prefixes: str) -> DebugCallStripFinder:
+    """Opt-in import hook for production builds. Every module imported afterwards whose name is or starts with one of
+    `prefixes` (like `"myapp"` for `myapp` and `myapp.sub`) is compiled without its `log`, `ilog` and `timer` calls.
+    Modules imported before are not affected."""
+    finder = DebugCallStripFinder(prefixes)
+    sys.meta_path.insert(0, finder)
+    return finder
+
+
+def uninstall_debug_call_stripper(finder: DebugCallStripFinder = None) -> None:
+    """Removes the given finder, or all installed ones, from `sys.meta_path`."""
+    sys.meta_path[:] = [f for f in sys.meta_path
+                        if not (f is finder or finder is None and isinstance(f, DebugCallStripFinder))]
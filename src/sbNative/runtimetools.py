@@ -1,10 +1,49 @@
+from __future__ import annotations
+
 import sys
 import os
-import inspect
-import pathlib
-import traceback
-import typing
 import types
+import atexit
+import collections
+import functools
+import marshal
+import threading
+import time
+
+
+class LazyModule:
+    """Stands in for a module and only imports it once one of its attributes is used, like `typing.Callable` when
+    `typing.get_type_hints` evaluates an annotation. Submodules like `multiprocessing.pool` are imported as needed."""
+
+    def __init__(self, name: str):
+        self._name = name
+
+    def __getattr__(self, attr: str) -> object:
+        if attr == "_name":
+            raise AttributeError(attr)
+
+        import importlib
+
+        module = importlib.import_module(self._name)
+        try:
+            return getattr(module, attr)
+        except AttributeError:
+            return importlib.import_module(f"{self._name}.{attr}")
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self._name!r})"
+
+
+## inspect, pathlib, traceback, multiprocessing and the like are imported inside the functions needing them, so
+## importing this module stays cheap. `typing` (which pulls in `re` and `enum`) and the rest are only needed for the
+## annotations, which still resolve through the `LazyModule` stand-ins.
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    import pathlib
+    import multiprocessing.pool
+    import typing
+else:
+    pathlib, multiprocessing, typing = LazyModule("pathlib"), LazyModule("multiprocessing"), LazyModule("typing")
 
 def is_running_as_executable() -> bool:
     # Check for the PyInstaller temp folder
@@ -13,6 +52,9 @@ def is_running_as_executable() -> bool:
     return False
 
 def get_path(depth: int = 1) -> pathlib.Path:
+    import inspect
+    import pathlib
+
     if not is_running_as_executable(): 
         ## regular case, non compiled
         fl = inspect.stack()[depth].filename ## not equal to __file__. __file__ points to this file (runtimetools) but this line fetches the file of the caller
@@ -24,38 +66,278 @@ def get_path(depth: int = 1) -> pathlib.Path:
     
 
 def globalise_all_sub_items(dest_file_globals, package_to_unpack, force_all=False) -> None:
+    import inspect
+
     for name, g in inspect.getmembers(package_to_unpack):
         if not force_all and name.startswith("_"):
             continue
         dest_file_globals[name] = g
 
 
+class LazySubItems:
+    """Resolves the sub items of a package one by one on first access instead of copying all of them up front like
+    `globalise_all_sub_items`. Works as a PEP 562 module level `__getattr__` (see `lazy_globalise_sub_items`) and as a
+    proxy, `items.name` and `items["name"]` resolve the same way.
+    `include` and `exclude` take names or `fnmatch` patterns. `touched` holds every name that was resolved so far."""
+
+    def __init__(self, package_to_unpack, include: typing.Iterable[str] = None, exclude: typing.Iterable[str] = None,
+                 force_all=False, dest_file_globals: dict = None, fallback: typing.Callable = None):
+        self.package = package_to_unpack
+        self.include = None if include is None else tuple(include)
+        self.exclude = tuple(exclude or ())
+        self.force_all = force_all
+        self.dest_file_globals = dest_file_globals
+        self.fallback = fallback
+        self.touched = {}
+
+    @property
+    def touched_count(self) -> int:
+        return len(self.touched)
+
+    def allows(self, name: str) -> bool:
+        import fnmatch
+
+        if any(fnmatch.fnmatchcase(name, pattern) for pattern in self.exclude):
+            return False
+        if self.include is not None:
+            return any(fnmatch.fnmatchcase(name, pattern) for pattern in self.include)
+        return self.force_all or not name.startswith("_")
+
+    def names(self) -> typing.List[str]:
+        """The names that could be resolved. Uses `dir`, so nothing is evaluated."""
+        return [name for name in dir(self.package) if self.allows(name)]
+
+    def __call__(self, name: str) -> object:
+        if name in self.touched:
+            return self.touched[name]
+
+        if self.allows(name):
+            try:
+                value = getattr(self.package, name)
+            except AttributeError:
+                pass
+            else:
+                self.touched[name] = value
+                if self.dest_file_globals is not None:
+                    self.dest_file_globals[name] = value
+                return value
+
+        if self.fallback is not None:
+            return self.fallback(name)
+        raise AttributeError(f"{name!r} is not a sub item of {getattr(self.package, '__name__', self.package)!r}")
+
+    def __getattr__(self, name: str) -> object:
+        if name.startswith("__"):
+            raise AttributeError(name)
+        return self(name)
+
+    def __getitem__(self, name: str) -> object:
+        try:
+            return self(name)
+        except AttributeError as e:
+            raise KeyError(name) from e
+
+    def __dir__(self) -> typing.List[str]:
+        return self.names()
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({getattr(self.package, '__name__', self.package)!r}, " \
+               f"touched={self.touched_count})"
+
+
+def lazy_globalise_sub_items(dest_file_globals, package_to_unpack, include: typing.Iterable[str] = None,
+                             exclude: typing.Iterable[str] = None, force_all=False) -> LazySubItems:
+    """Lazy counterpart of `globalise_all_sub_items`. Installs a module level `__getattr__` into `dest_file_globals`,
+    so `module.name` resolves from `package_to_unpack` on first access and is cached in the globals afterwards.
+    Bare names used inside the destination module itself are not covered by PEP 562, use the returned `LazySubItems`
+    for those."""
+    items = LazySubItems(package_to_unpack, include, exclude, force_all, dest_file_globals,
+                         dest_file_globals.get("__getattr__"))
+    previous_dir = dest_file_globals.get("__dir__")
+
+    def __dir__():
+        own = previous_dir() if previous_dir is not None else list(dest_file_globals)
+        return sorted(set(own) | set(items.names()))
+
+    dest_file_globals["__getattr__"] = items
+    dest_file_globals["__dir__"] = __dir__
+    return items
+
+
 class InterpreterError(Exception):
     pass
 
 
-def exec_with_exc_tb(cmd, globs=None, locs=None, description='source string') -> None:
-    try:
-        exec(cmd, globs, locs)
-    except SyntaxError as e:
-        error_class = e.__class__.__name__
-        detail = e.args[0]
-        line_number = e.lineno
+COMPILE_CACHE_SIZE: int = 128
+
+_compile_cache = collections.OrderedDict()
+_compile_cache_lock = threading.Lock()
+
+_exec_pool = None
+
+
+def _code_filename(description: str) -> str:
+    return f"<{description}>"
+
+
+def compile_cached(cmd: typing.Union[str, types.CodeType], description: str = 'source string') -> types.CodeType:
+    """Compiles `cmd` for `exec` and keeps the code object in an LRU cache keyed by a hash of the source and the
+    description, so the same snippet is only ever parsed once. Holds at most `COMPILE_CACHE_SIZE` code objects."""
+    if isinstance(cmd, types.CodeType):
+        return cmd
+
+    import hashlib
+
+    key = hashlib.sha1(f"{description}\0{cmd}".encode()).digest()
+    with _compile_cache_lock:
+        code = _compile_cache.get(key)
+        if code is not None:
+            _compile_cache.move_to_end(key)
+            return code
+
+    code = compile(cmd, _code_filename(description), "exec")
 
-    except Exception as e:
-        error_class = e.__class__.__name__
-        detail = e.args[0]
-        cl, exc, tb = sys.exc_info()
+    with _compile_cache_lock:
+        _compile_cache[key] = code
+        while len(_compile_cache) > max(COMPILE_CACHE_SIZE, 0):
+            _compile_cache.popitem(last=False)
+    return code
 
-        line_number = traceback.extract_tb(tb)[-1][1]
+
+def clear_compile_cache() -> None:
+    with _compile_cache_lock:
+        _compile_cache.clear()
+
+
+def _interpreter_error_message(e: BaseException, description: str) -> str:
+    import traceback
+
+    error_class = e.__class__.__name__
+    detail = e.args[0] if e.args else ""
+
+    if isinstance(e, SyntaxError):
+        line_number = e.lineno
     else:
+        ## report the line inside the executed source, not the line of whatever it called last
+        frames = traceback.extract_tb(e.__traceback__)
+        own_frames = [f for f in frames if f.filename == _code_filename(description)]
+        line_number = (own_frames or frames)[-1][1]
+
+    return f"{error_class} at line {line_number} of {description}: {detail}"
+
+
+def _picklable_items(namespace: dict) -> dict:
+    import pickle
+
+    ret = {}
+    for name, value in namespace.items():
+        if name == "__builtins__":
+            continue
+        try:
+            pickle.dumps(value)
+        except Exception:
+            continue
+        ret[name] = value
+    return ret
+
+
+def _isolated_exec_worker(cmd: typing.Union[str, bytes], globs: dict, locs: typing.Optional[dict],
+                          description: str) -> typing.Tuple[bool, typing.Union[str, dict]]:
+    """Runs inside a worker process. Returns `(True, resulting_namespace)` or `(False, error_message)`."""
+    if isinstance(cmd, bytes):
+        cmd = marshal.loads(cmd)
+    try:
+        exec(compile_cached(cmd, description), globs, locs)
+    except BaseException as e:
+        ## SystemExit and KeyboardInterrupt would take the worker down without sending a result back
+        return False, _interpreter_error_message(e, description)
+    return True, _picklable_items(locs if locs is not None else globs)
+
+
+def _isolated_exec_process(connection, *args) -> None:
+    connection.send(_isolated_exec_worker(*args))
+    connection.close()
+
+
+def get_exec_pool(processes: int = None) -> multiprocessing.pool.Pool:
+    """Returns the process pool used by `exec_with_exc_tb(..., isolated=True)` without a timeout, creating it on
+    first use."""
+    import multiprocessing
+
+    global _exec_pool
+    if _exec_pool is None:
+        _exec_pool = multiprocessing.Pool(processes)
+    return _exec_pool
+
+
+def shutdown_exec_pool() -> None:
+    """Kills the pool processes, including any snippet that is still running. A new pool is created on demand."""
+    global _exec_pool
+    if _exec_pool is not None:
+        _exec_pool.terminate()
+        _exec_pool.join()
+        _exec_pool = None
+
+
+atexit.register(shutdown_exec_pool)
+
+
+def exec_with_exc_tb(cmd, globs=None, locs=None, description='source string',
+                     isolated=False, timeout: float = None) -> None:
+    """Extends the built-in `exec`, raising an `InterpreterError` pointing at the failing line of `cmd` instead.
+    Compiled code is reused through `compile_cached`, also when it runs `isolated`.
+    With `isolated`, the code runs in another process so it can not block this interpreter. `globs` and `locs` have to
+    be picklable then, every picklable name the code leaves in them is written back afterwards. Without a `timeout`,
+    a worker of `get_exec_pool` is used. With one, the code gets its own process, which is killed after `timeout`
+    seconds (raising an `InterpreterError`) without affecting any other call."""
+    if not isolated:
+        try:
+            exec(compile_cached(cmd, description), globs, locs)
+        except Exception as e:
+            raise InterpreterError(_interpreter_error_message(e, description)) from None
         return
 
-    raise InterpreterError(
-        f"{error_class} at line {line_number} of {description}: {detail}")
+    import multiprocessing
+
+    if globs is None:
+        globs = {}
+    ## compiled here, so repeated snippets hit the compile cache of this process instead of being parsed again by
+    ## every (fresh) worker
+    try:
+        code = compile_cached(cmd, description)
+    except SyntaxError as e:
+        raise InterpreterError(_interpreter_error_message(e, description)) from None
+    args = (marshal.dumps(code), _picklable_items(globs), None if locs is None else _picklable_items(locs), description)
+
+    if timeout is None:
+        success, value = get_exec_pool().apply_async(_isolated_exec_worker, args).get()
+    else:
+        receiver, sender = multiprocessing.Pipe(duplex=False)
+        process = multiprocessing.Process(target=_isolated_exec_process, args=(sender, *args), daemon=True)
+        process.start()
+        sender.close()
+        try:
+            if not receiver.poll(timeout):
+                process.terminate()
+                raise InterpreterError(f"TimeoutError of {description}: did not finish within {timeout} seconds")
+            try:
+                success, value = receiver.recv()
+            except EOFError:
+                process.join()
+                raise InterpreterError(f"ProcessError of {description}: the worker exited with code "
+                                       f"{process.exitcode}") from None
+        finally:
+            receiver.close()
+            process.join()
+
+    if not success:
+        raise InterpreterError(value)
+    (locs if locs is not None else globs).update(value)
 
 
 def get_default_args(func):
+    import inspect
+
     signature = inspect.signature(func)
     return {
         k: v.default
@@ -69,6 +351,10 @@ class DecoratorError(Exception):
 
 
 def run_and_cast(func) -> typing.Callable:
+    import inspect
+    import traceback
+    import typing
+
     def wrapper(*args, **kwargs):
         cast_to = dict(inspect.signature(func).parameters.items())
         for k, v in typing.get_type_hints(func).items():
@@ -107,6 +393,238 @@ def run_and_cast(func) -> typing.Callable:
     return wrapper
 
 
+MemoizeInfo = collections.namedtuple(
+    "MemoizeInfo", ["hits", "misses", "evictions", "expirations", "coalesced", "currsize", "maxsize", "bytes",
+                    "max_bytes"])
+
+_MISSING = object()
+
+
+class _KwargsMark:
+    """Separates the positional from the keyword arguments in memoize keys, pickled by reference so persisted keys
+    still match."""
+
+
+class _MemoEntry:
+    __slots__ = ("value", "expires_at", "size", "frequency")
+
+    def __init__(self, value, expires_at, size):
+        self.value = value
+        self.expires_at = expires_at
+        self.size = size
+        self.frequency = 1
+
+
+class _InFlight:
+    __slots__ = ("done", "value", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class MemoizedFunction:
+    """The function returned by `memoize`. Thread safe, concurrent calls missing the same key wait for the first one
+    to compute the result instead of computing it again (counted as `coalesced`)."""
+    POLICIES = ("lru", "lfu", "ttl")
+
+    def __init__(self, func, maxsize: int = 128, policy: str = "lru", ttl: float = None, max_bytes: int = None,
+                 sizeof: typing.Callable[[object], int] = sys.getsizeof, persist_path=None):
+        if policy not in self.POLICIES:
+            raise ValueError(f"{policy!r} is not one of the eviction policies {self.POLICIES}")
+        if policy == "ttl" and ttl is None:
+            raise ValueError("The 'ttl' policy needs a ttl")
+
+        functools.update_wrapper(self, func)
+        self.func = func
+        self.maxsize = maxsize
+        self.policy = policy
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.persist_path = persist_path
+
+        self._lock = threading.RLock()
+        self._entries = collections.OrderedDict()
+        ## lfu only, frequency -> keys with that frequency, least recently used first
+        self._frequencies = collections.defaultdict(collections.OrderedDict)
+        self._in_flight = {}
+        self._bytes = 0
+        self.hits = self.misses = self.evictions = self.expirations = self.coalesced = 0
+
+        if persist_path is not None:
+            self.load()
+            atexit.register(self.save)
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        return types.MethodType(self, instance)
+
+    @staticmethod
+    def _make_key(args, kwargs):
+        if not kwargs:
+            return args
+        return args + (_KwargsMark,) + tuple(sorted(kwargs.items()))
+
+    def __call__(self, *args, **kwargs):
+        key = self._make_key(args, kwargs)
+
+        with self._lock:
+            value = self._lookup(key)
+            if value is not _MISSING:
+                self.hits += 1
+                return value
+
+            flight = self._in_flight.get(key)
+            is_leader = flight is None
+            if is_leader:
+                flight = self._in_flight[key] = _InFlight()
+                self.misses += 1
+            else:
+                self.coalesced += 1
+
+        if not is_leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = self.func(*args, **kwargs)
+        except BaseException as e:
+            flight.error = e
+            raise
+        else:
+            with self._lock:
+                self._store(key, flight.value, None if self.ttl is None else time.time() + self.ttl)
+            return flight.value
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+            flight.done.set()
+
+    def _lookup(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return _MISSING
+        if entry.expires_at is not None and entry.expires_at <= time.time():
+            self._remove(key)
+            self.expirations += 1
+            return _MISSING
+
+        if self.policy == "lru":
+            self._entries.move_to_end(key)
+        elif self.policy == "lfu":
+            del self._frequencies[entry.frequency][key]
+            if not self._frequencies[entry.frequency]:
+                del self._frequencies[entry.frequency]
+            entry.frequency += 1
+            self._frequencies[entry.frequency][key] = None
+        return entry.value
+
+    def _store(self, key, value, expires_at):
+        if self.maxsize is not None and self.maxsize <= 0:
+            return
+        size = self.sizeof(value) if self.max_bytes is not None else 0
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = _MemoEntry(value, expires_at, size)
+        self._bytes += size
+        if self.policy == "lfu":
+            self._frequencies[1][key] = None
+
+        while ((self.maxsize is not None and len(self._entries) > self.maxsize) or
+               (self.max_bytes is not None and self._bytes > self.max_bytes)):
+            self._remove(self._victim(key))
+            self.evictions += 1
+
+    def _victim(self, new_key):
+        if self.policy == "lfu":
+            for frequency in sorted(self._frequencies):
+                for key in self._frequencies[frequency]:
+                    if key != new_key:
+                        return key
+        ## lru: least recently used first, ttl: the oldest (so first to expire) first
+        for key in self._entries:
+            if key != new_key:
+                return key
+        return new_key
+
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+        if self.policy == "lfu":
+            del self._frequencies[entry.frequency][key]
+            if not self._frequencies[entry.frequency]:
+                del self._frequencies[entry.frequency]
+
+    def cache_info(self) -> MemoizeInfo:
+        with self._lock:
+            return MemoizeInfo(self.hits, self.misses, self.evictions, self.expirations, self.coalesced,
+                               len(self._entries), self.maxsize, self._bytes, self.max_bytes)
+
+    def cache_clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._frequencies.clear()
+            self._bytes = 0
+            self.hits = self.misses = self.evictions = self.expirations = self.coalesced = 0
+
+    def report(self, depth: int = 3) -> None:
+        """Logs the statistics from `cache_info` with `debugtools.ilog`."""
+        try:
+            from .debugtools import ilog
+        except ImportError:
+            from debugtools import ilog
+        ilog(f"memoize `{self.__qualname__}`", depth=depth, **self.cache_info()._asdict())
+
+    def save(self, path=None) -> None:
+        """Pickles the cached results to `path` (`persist_path` by default). Done automatically at exit when a
+        `persist_path` was given."""
+        import pickle
+
+        path = path or self.persist_path
+        with self._lock:
+            items = [(key, entry.value, entry.expires_at) for key, entry in self._entries.items()]
+        with open(f"{path}.tmp", "wb") as f:
+            pickle.dump(items, f)
+        os.replace(f"{path}.tmp", path)
+
+    def load(self, path=None) -> None:
+        """Adds the results saved by `save` to the cache, skipping expired ones. A missing file is ignored."""
+        import pickle
+
+        path = path or self.persist_path
+        try:
+            with open(path, "rb") as f:
+                items = pickle.load(f)
+        except FileNotFoundError:
+            return
+        now = time.time()
+        with self._lock:
+            for key, value, expires_at in items:
+                if expires_at is None or expires_at > now:
+                    self._store(key, value, expires_at)
+
+
+def memoize(func=None, *, maxsize: int = 128, policy: str = "lru", ttl: float = None, max_bytes: int = None,
+            sizeof: typing.Callable[[object], int] = sys.getsizeof, persist_path=None):
+    """Caches the results of the decorated function by its (hashable) arguments, like `functools.lru_cache`.
+    `policy` decides what is evicted once more than `maxsize` results or `max_bytes` (measured with `sizeof`) are
+    stored: "lru" the least recently used, "lfu" the least frequently used, "ttl" the oldest result. With `ttl`,
+    results expire after that many seconds. With `persist_path`, the cache is loaded from that file and saved to it at
+    exit. The statistics are available with `cache_info()` and can be logged with `report()`.
+    Usable as `@memoize` or `@memoize(...)`."""
+    if func is None:
+        return lambda f: MemoizedFunction(f, maxsize, policy, ttl, max_bytes, sizeof, persist_path)
+    return MemoizedFunction(func, maxsize, policy, ttl, max_bytes, sizeof, persist_path)
+
+
 def safe_iter(itr: typing.Sequence) -> types.GeneratorType:
     """Warning, very slow with large iterators."""
     i = 0
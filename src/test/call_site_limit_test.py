@@ -0,0 +1,83 @@
+import contextlib
+import io
+import os
+import pathlib
+import sys
+import time
+
+src_path = pathlib.Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(src_path))
+
+from sbNative import debugtools
+from sbNative.debugtools import ilog, log, timer
+
+## keeps the logs on one line, the width of a redirected terminal falls back to 80 columns
+os.environ["COLUMNS"] = "1000"
+
+
+def printed_lines(func, *args, **kwargs):
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        func(*args, **kwargs)
+    return output.getvalue().splitlines()
+
+
+def log_loop(calls, **limits):
+    for i in range(calls):
+        log(i, **limits)
+
+
+def log_at(times, **limits):
+    """Logs once per entry of `times`, with `time.monotonic` returning that entry."""
+    monotonic = time.monotonic
+    try:
+        for now in times:
+            time.monotonic = lambda: now
+            log(now, **limits)
+    finally:
+        time.monotonic = monotonic
+
+
+def expect_value_error(option, func, *args, **kwargs):
+    try:
+        func(*args, **kwargs)
+    except ValueError as e:
+        assert option in str(e), f"unexpected message: {e}"
+    else:
+        raise AssertionError(f"{option} was not rejected")
+
+
+## sampling logs the 1st, 4th, 7th ... call and tells how many were skipped in between
+lines = printed_lines(log_loop, 10, sample_every=3)
+assert [line.split(" --> ")[0] for line in lines] == \
+    ["LOG: (0)", "LOG: (3) [2 suppressed]", "LOG: (6) [2 suppressed]", "LOG: (9) [2 suppressed]"], lines
+assert lines[0].endswith(f"call_site_limit_test.py:{log_loop.__code__.co_firstlineno + 2}")
+
+## the limits are kept per call site, `ilog` adds the suffix after its own `end`
+lines = printed_lines(lambda: [ilog("step", i, end="s", first_calls=2) for i in range(5)])
+assert [line.split(" --> ")[0] for line in lines] == ["LOG ('step'): (0)s", "LOG ('step'): (1)s"], lines
+
+## token bucket of 2 logs, refilled with 2 logs per second
+lines = printed_lines(log_at, [100.0] * 5 + [100.5, 100.5, 110.0, 110.0, 110.0], rate_limit=2)
+assert [line.split(" --> ")[0] for line in lines] == \
+    ["LOG: (100.0)", "LOG: (100.0)", "LOG: (100.5) [3 suppressed]", "LOG: (110.0) [1 suppressed]", "LOG: (110.0)"], \
+    lines
+
+## calls suppressed after the last log that went through are reported at exit
+lines = printed_lines(debugtools._print_suppressed_logs)
+assert len(lines) == 2, lines
+assert lines[0].startswith("LOG: 3 more calls suppressed --> ")
+path = log_at.__code__.co_filename.replace("\\", "/")
+assert lines[1] == f"LOG: 1 more calls suppressed --> {path}:{log_at.__code__.co_firstlineno + 6}", lines
+
+## a timed function logs through the same limits
+fast = timer(lambda: None, first_calls=1)
+lines = printed_lines(lambda: [fast() for _ in range(3)])
+assert len(lines) == 1 and "took" in lines[0], lines
+
+for option in ("rate_limit", "sample_every", "first_calls"):
+    expect_value_error(option, log, "never printed", **{option: 0})
+    expect_value_error(option, ilog, "never printed", 1, **{option: -1})
+    expect_value_error(option, timer, **{option: 0})
+
+print("log limited its call sites by sampling, first calls and rate and reported the suppressed calls")
@@ -0,0 +1,217 @@
+import ast
+import math
+import pathlib
+import sys
+import textwrap
+
+src_path = pathlib.Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(src_path))
+
+from sbNative.productiontools import strip_debug_calls
+
+## source -> expected source after stripping
+CASES = {
+    "aliases": ("""
+        from sbNative.debugtools import log as l, ilog as il, timer
+        l("removed", expensive())
+        value = il(compute())
+        log("another log, not imported")
+    """, """
+        from sbNative.debugtools import log as l, ilog as il, timer
+        value = None
+        log('another log, not imported')
+    """),
+
+    "module aliases": ("""
+        import sbNative
+        import sbNative.debugtools as dt
+        from sbNative import debugtools
+        dt.log(1)
+        debugtools.ilog(2)
+        sbNative.debugtools.log(3)
+        dt.clean_repr(4)
+    """, """
+        import sbNative
+        import sbNative.debugtools as dt
+        from sbNative import debugtools
+        dt.clean_repr(4)
+    """),
+
+    "star import": ("""
+        from sbNative.debugtools import *
+        log(1)
+        total = ilog(2) + 1
+    """, """
+        from sbNative.debugtools import *
+        total = None + 1
+    """),
+
+    "star import rebound later": ("""
+        from sbNative.debugtools import *
+        from math import log
+        y = log(8)
+        def timer():
+            pass
+        timer()
+        ilog(1)
+    """, """
+        from sbNative.debugtools import *
+        from math import log
+        y = log(8)
+
+        def timer():
+            pass
+        timer()
+    """),
+
+    "decorators": ("""
+        from sbNative.debugtools import timer
+        import sbNative.debugtools as dt
+
+        @timer
+        def first():
+            return 1
+
+        @dt.timer(rate_limit=5)
+        @staticmethod
+        def second():
+            return 2
+
+        @timer
+        class Third:
+            pass
+    """, """
+        from sbNative.debugtools import timer
+        import sbNative.debugtools as dt
+
+        def first():
+            return 1
+
+        @staticmethod
+        def second():
+            return 2
+
+        class Third:
+            pass
+    """),
+
+    "timer as a value": ("""
+        from sbNative.debugtools import timer
+        import sbNative.debugtools as dt
+        fast = timer(slow)
+        faster = dt.timer(rate_limit=1)(slow)
+        keyword = timer(func=slow, sample_every=2)
+        decorate = timer(first_calls=3)
+        unknown = timer(*functions)
+
+        class Methods:
+            method = timer(lambda self: 1)
+    """, """
+        from sbNative.debugtools import timer
+        import sbNative.debugtools as dt
+        fast = slow
+        faster = slow
+        keyword = slow
+        decorate = lambda func: func
+        unknown = timer(*functions)
+
+        class Methods:
+            method = lambda self: 1
+    """),
+
+    "shadowed explicit imports": ("""
+        import math
+        from sbNative.debugtools import log, ilog
+        import sbNative.debugtools as dt
+
+        def f(x, log=math.log):
+            return log(x)
+
+        def g(x):
+            from math import log
+            return log(x)
+
+        def h(dt):
+            return dt.ilog(1)
+        ilog(1)
+    """, """
+        import math
+        from sbNative.debugtools import log, ilog
+        import sbNative.debugtools as dt
+
+        def f(x, log=math.log):
+            return log(x)
+
+        def g(x):
+            from math import log
+            return log(x)
+
+        def h(dt):
+            return dt.ilog(1)
+    """),
+
+    "emptied blocks": ("""
+        from sbNative.debugtools import log
+        def f(x):
+            log(x)
+        if x:
+            log(x)
+        else:
+            log(-x)
+        for i in range(3):
+            log(i)
+        try:
+            log(1)
+        except ValueError:
+            log(2)
+        finally:
+            log(3)
+    """, """
+        from sbNative.debugtools import log
+
+        def f(x):
+            pass
+        if x:
+            pass
+        else:
+            pass
+        for i in range(3):
+            pass
+        try:
+            pass
+        except ValueError:
+            pass
+        finally:
+            pass
+    """),
+}
+
+
+def stripped(source):
+    return ast.unparse(strip_debug_calls(ast.parse(textwrap.dedent(source))))
+
+
+for name, (source, expected) in CASES.items():
+    result = stripped(source)
+    expected = ast.unparse(ast.parse(textwrap.dedent(expected)))
+    assert result == expected, f"{name}:\n{result}\n---- expected ----\n{expected}"
+
+## arguments of removed calls are never evaluated
+namespace = {}
+exec(compile(strip_debug_calls(ast.parse("from sbNative.debugtools import log\nlog(1 / 0)\nresult = 1")),
+             "<stripped>", "exec"), namespace)
+assert namespace["result"] == 1
+
+## rebound names keep working, the timed function stays callable
+namespace = {}
+exec(compile(strip_debug_calls(ast.parse(textwrap.dedent("""
+    import math
+    from sbNative.debugtools import log, timer
+    def f(x, log=math.log):
+        return log(x)
+    square = timer(lambda x: x * x)
+    cube = timer(rate_limit=1)(lambda x: x ** 3)
+"""))), "<stripped>", "exec"), namespace)
+assert namespace["f"](math.e) == 1 and namespace["square"](3) == 9 and namespace["cube"](2) == 8
+
+print(f"the debug call stripper handled all {len(CASES)} cases")
@@ -0,0 +1,106 @@
+import pathlib
+import sys
+import threading
+import time
+
+src_path = pathlib.Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(src_path))
+
+from sbNative import runtimetools
+from sbNative.runtimetools import InterpreterError, compile_cached, exec_with_exc_tb
+
+FAILING_SNIPPET = """
+a = 1
+b = 2
+c = a / 0
+"""
+
+
+def expect_interpreter_error(message_part, *args, **kwargs):
+    try:
+        exec_with_exc_tb(*args, **kwargs)
+    except InterpreterError as e:
+        assert message_part in str(e), f"unexpected message: {e}"
+    else:
+        raise AssertionError(f"exec_with_exc_tb{args} did not raise an InterpreterError")
+
+
+def check_compile_cache():
+    runtimetools.clear_compile_cache()
+    first = compile_cached("x = 1", "rule")
+    assert compile_cached("x = 1", "rule") is first
+    ## the description is part of the key, it is the file name of the code
+    assert compile_cached("x = 1", "other rule") is not first
+
+    size = runtimetools.COMPILE_CACHE_SIZE
+    runtimetools.COMPILE_CACHE_SIZE = 2
+    try:
+        compile_cached("y = 2", "rule")
+        compile_cached("z = 3", "rule")
+        assert len(runtimetools._compile_cache) == 2
+        assert compile_cached("x = 1", "rule") is not first, "the least recently used code was not evicted"
+    finally:
+        runtimetools.COMPILE_CACHE_SIZE = size
+        runtimetools.clear_compile_cache()
+
+
+def check_in_process():
+    namespace = {}
+    exec_with_exc_tb("result = 6 * 7", namespace)
+    assert namespace["result"] == 42
+
+    expect_interpreter_error("ZeroDivisionError at line 4 of divide: division by zero", FAILING_SNIPPET,
+                             description="divide")
+    expect_interpreter_error("SyntaxError at line 2 of broken", "ok = 1\nok = = 2", description="broken")
+
+
+def check_isolated():
+    runtimetools.clear_compile_cache()
+    namespace = {"base": 40, "unpicklable": threading.Lock()}
+    exec_with_exc_tb("result = base + 2\nhelper = lambda: None\nimport math", namespace, isolated=True)
+    assert namespace["result"] == 42
+    ## the lambda and the module can not be sent back, the lock could not be sent there
+    assert "helper" not in namespace and "math" not in namespace and "unpicklable" in namespace
+
+    locs = {}
+    exec_with_exc_tb("inner = 1", {}, locs, isolated=True, timeout=10)
+    assert locs == {"inner": 1}
+    ## compiled in this process, also when the code runs in a process of its own
+    assert len(runtimetools._compile_cache) == 2
+
+    expect_interpreter_error("ZeroDivisionError at line 4 of divide", FAILING_SNIPPET, description="divide",
+                             isolated=True)
+    expect_interpreter_error("SyntaxError at line 2 of broken", "ok = 1\nok = = 2", description="broken",
+                             isolated=True, timeout=10)
+    expect_interpreter_error("ZeroDivisionError at line 4 of divide", FAILING_SNIPPET, description="divide",
+                             isolated=True, timeout=10)
+    expect_interpreter_error("SystemExit at line 1 of exits", "raise SystemExit(3)", description="exits",
+                             isolated=True)
+    expect_interpreter_error("KeyboardInterrupt at line 1 of interrupted", "raise KeyboardInterrupt",
+                             description="interrupted", isolated=True, timeout=10)
+    expect_interpreter_error("ProcessError of killed: the worker exited with code 5", "import os\nos._exit(5)",
+                             description="killed", isolated=True, timeout=10)
+
+
+def check_timeout():
+    ## a slow call without a timeout shares the pool, another call timing out must not take it down
+    pooled = {}
+    thread = threading.Thread(
+        target=lambda: exec_with_exc_tb("import time\ntime.sleep(1)\ndone = True", pooled, isolated=True))
+    thread.start()
+
+    begin = time.monotonic()
+    expect_interpreter_error("TimeoutError of endless: did not finish within 0.5 seconds", "while True: pass",
+                             description="endless", isolated=True, timeout=0.5)
+    assert time.monotonic() - begin < 5
+
+    thread.join(10)
+    assert pooled.get("done") is True
+
+
+if __name__ == "__main__":
+    check_compile_cache()
+    check_in_process()
+    check_isolated()
+    check_timeout()
+    print("exec_with_exc_tb cached, reported, isolated and timed out snippets as expected")
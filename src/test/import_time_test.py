@@ -0,0 +1,50 @@
+import os
+import pathlib
+import subprocess
+import sys
+import tempfile
+
+## cumulative microseconds `import sbNative.debugtools, sbNative.runtimetools` may take with a warm bytecode cache
+IMPORT_TIME_BUDGET_US = 15_000
+
+## these must only be imported once a function actually needs them
+DEFERRED_MODULES = ["inspect", "traceback", "webbrowser", "shutil", "typing", "pathlib", "multiprocessing",
+                    "pickle", "hashlib"]
+
+src_path = pathlib.Path(__file__).resolve().parent.parent
+
+
+def import_times(statement, pycache_prefix):
+    env = {**os.environ, "PYTHONPATH": str(src_path), "PYTHONPYCACHEPREFIX": pycache_prefix}
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    stderr = subprocess.run([sys.executable, "-X", "importtime", "-c", statement], env=env, cwd=src_path,
+                            capture_output=True, text=True, check=True).stderr
+
+    times, top_level = {}, set()
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        times[name.strip()] = int(cumulative)
+        ## nested imports are indented, their time is already part of the cumulative time of the importing module
+        if not name.startswith("  "):
+            top_level.add(name.strip())
+    return times, top_level
+
+
+with tempfile.TemporaryDirectory() as pycache:
+    import_times("import sbNative", pycache)
+    times, _ = import_times("import sbNative", pycache)
+    assert list(times).count("sbNative") == 1 and not any(n.startswith("sbNative.") for n in times), \
+        f"`import sbNative` imported submodules: {list(times)}"
+
+    statement = "import sbNative.debugtools, sbNative.runtimetools"
+    import_times(statement, pycache)
+    times, top_level = import_times(statement, pycache)
+
+eager = [name for name in DEFERRED_MODULES if name in times]
+assert not eager, f"imported eagerly: {eager}"
+
+total = sum(times[name] for name in ("sbNative", "sbNative.debugtools", "sbNative.runtimetools") if name in top_level)
+assert total <= IMPORT_TIME_BUDGET_US, f"importing took {total}us, budget is {IMPORT_TIME_BUDGET_US}us"
+print(f"importing sbNative.debugtools and sbNative.runtimetools took {total}us")
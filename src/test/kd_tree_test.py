@@ -0,0 +1,62 @@
+import math
+import pathlib
+import random
+import sys
+
+src_path = pathlib.Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(src_path))
+
+from sbNative import geometrics
+
+POINTS = 2_000
+QUERIES = 50
+
+
+def brute_force_nearest(points, target, k):
+    return sorted((math.dist(target, point), idx) for idx, point in enumerate(points))[:k]
+
+
+def brute_force_within_radius(points, target, radius):
+    return sorted(idx for idx, point in enumerate(points) if math.dist(target, point) <= radius)
+
+
+def check_against_brute_force(dimension, rng):
+    ## few distinct coordinates, so there are ties and points on the splitting planes
+    points = [tuple(float(rng.randint(-20, 20)) for _ in range(dimension)) for _ in range(POINTS)]
+    cloud = geometrics.PointCloud(points)
+
+    for _ in range(QUERIES):
+        target = tuple(rng.uniform(-25, 25) for _ in range(dimension))
+        for k in (0, 1, 7, 64):
+            found = cloud.nearest(target, k)
+            expected = brute_force_nearest(points, target, k)
+            assert [d for d, _ in found] == [d for d, _ in expected], (dimension, target, k)
+            assert all(math.dist(target, points[idx]) == d for d, idx in found)
+
+        for radius in (0.0, 1.5, 6.0, 100.0):
+            assert sorted(cloud.within_radius(target, radius)) == brute_force_within_radius(points, target, radius), \
+                (dimension, target, radius)
+
+    ## querying an existing point finds itself at distance 0
+    assert cloud.nearest(points[123])[0][0] == 0.0
+    assert 123 in cloud.within_radius(points[123], 0.0)
+
+
+def run(numpy_enabled):
+    rng = random.Random(2024)
+    geometrics._numpy_module = None if numpy_enabled else False
+    for dimension in (1, 2, 3, 5):
+        check_against_brute_force(dimension, rng)
+
+    cloud = geometrics.PointCloud([(1.0, 2.0)])
+    assert cloud.nearest((0.0, 0.0), 5) == [(math.dist((0.0, 0.0), (1.0, 2.0)), 0)]
+    assert geometrics.PointCloud([], 2).within_radius((0.0, 0.0), 1.0) == []
+
+
+numpy_installed = geometrics._numpy() is not None
+run(numpy_enabled=False)
+if not numpy_installed:
+    print("numpy is not installed, only the array('d') KD-tree was tested")
+else:
+    run(numpy_enabled=True)
+    print("the KD-tree matches the brute force results with and without numpy")
@@ -0,0 +1,92 @@
+import pathlib
+import sys
+import threading
+import time
+
+src_path = pathlib.Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(src_path))
+
+from sbNative.runtimetools import memoize
+
+THREADS = 8
+
+
+def cached_keys(memoized):
+    return [key[0] for key in memoized._entries]
+
+
+## lfu evicts the least frequently used result, the least recently used one among equally frequent results
+@memoize(maxsize=3, policy="lfu")
+def lfu(x):
+    return x * 2
+
+
+for x in (1, 2, 3, 1, 1, 2):
+    lfu(x)
+lfu(4)
+assert sorted(cached_keys(lfu)) == [1, 2, 4], cached_keys(lfu)
+lfu(5)
+assert sorted(cached_keys(lfu)) == [1, 2, 5], cached_keys(lfu)
+info = lfu.cache_info()
+assert (info.hits, info.misses, info.evictions, info.currsize) == (3, 5, 2, 3), info
+
+
+## ttl results expire, the oldest one is evicted first when the cache is full
+@memoize(maxsize=2, policy="ttl", ttl=0.2)
+def ttl(x):
+    return object()
+
+
+first = ttl(1)
+assert ttl(1) is first
+ttl(2)
+ttl(3)
+assert cached_keys(ttl) == [2, 3] and ttl.cache_info().evictions == 1
+time.sleep(0.3)
+assert ttl(2) is not first and ttl.cache_info().expirations == 1
+
+
+## max_bytes evicts until the sizes of the cached results fit, results larger than max_bytes are not cached at all
+@memoize(maxsize=None, max_bytes=10, sizeof=len)
+def text(char, n):
+    return char * n
+
+
+text("a", 4), text("b", 4), text("c", 2)
+assert text.cache_info().bytes == 10
+text("a", 4)
+text("d", 3)
+assert [key[0] for key in text._entries] == ["c", "a", "d"] and text.cache_info().bytes == 9
+text("e", 11)
+assert ("e", 11) not in text._entries and text.cache_info().bytes == 9
+
+
+## concurrent calls with the same arguments wait for the first one instead of computing the result again
+release = threading.Event()
+computations = []
+
+
+@memoize
+def slow(x):
+    computations.append(x)
+    release.wait(5)
+    return [x]
+
+
+results = []
+threads = [threading.Thread(target=lambda: results.append(slow(7))) for _ in range(THREADS)]
+for thread in threads:
+    thread.start()
+deadline = time.monotonic() + 5
+while slow.cache_info().coalesced < THREADS - 1 and time.monotonic() < deadline:
+    time.sleep(0.001)
+release.set()
+for thread in threads:
+    thread.join()
+
+info = slow.cache_info()
+assert computations == [7], computations
+assert (info.misses, info.coalesced, info.hits) == (1, THREADS - 1, 0), info
+assert len(results) == THREADS and all(result is results[0] for result in results)
+
+print("memoize evicted by lfu, ttl and max_bytes and coalesced concurrent calls as expected")
@@ -0,0 +1,68 @@
+import pathlib
+import sys
+import tempfile
+
+src_path = pathlib.Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(src_path))
+
+from sbNative.geometrics import PointCloud, POINT_FILE_MAGIC, _point_file_header
+
+
+def expect_value_error(message_part, func, *args):
+    try:
+        func(*args)
+    except ValueError as e:
+        assert message_part in str(e), f"unexpected message: {e}"
+    else:
+        raise AssertionError(f"{func.__qualname__}{args} did not raise a ValueError")
+
+
+with tempfile.TemporaryDirectory() as tmp:
+    path = pathlib.Path(tmp) / "points.sbpt"
+
+    first = PointCloud([(1.0, 2.0, 3.0), (4.0, 5.0, 6.0)])
+    second = PointCloud([(-1.5, 0.0, 1e300), (7.0, 8.0, 9.0), (0.1, 0.2, 0.3)])
+    first.save(path)
+    second.append_to(path)
+    assert path.stat().st_size == _point_file_header.size + 5 * 3 * 8
+
+    loaded = PointCloud.load(path)
+    assert (len(loaded), loaded.dimension) == (5, 3)
+    assert [tuple(p) for p in loaded] == [tuple(p) for p in first] + [tuple(p) for p in second]
+    assert loaded.nearest((7.0, 8.0, 9.1))[0][1] == 3
+    ## the file stays mapped while the cloud is alive, which would keep windows from deleting it
+    del loaded
+
+    ## appending to a file saved without points takes over the dimension of the appended points
+    empty_path = pathlib.Path(tmp) / "empty.sbpt"
+    PointCloud([], 2).save(empty_path)
+    assert len(PointCloud.load(empty_path)) == 0
+    PointCloud([(1.0, 2.0)]).append_to(empty_path)
+    assert [tuple(p) for p in PointCloud.load(empty_path)] == [(1.0, 2.0)]
+
+    ## changes of a writable load end up in the file
+    writable = PointCloud.load(path, writable=True)
+    writable[0].x = 42.0
+    del writable
+    assert PointCloud.load(path)[0].x == 42.0
+
+    expect_value_error("Can not append points of 2 dimensions", PointCloud([(1.0, 2.0)]).append_to, path)
+
+    not_a_point_file = pathlib.Path(tmp) / "text.sbpt"
+    not_a_point_file.write_bytes(b"just some text, long enough for a header")
+    expect_value_error("is not a point file", PointCloud.load, not_a_point_file)
+
+    short = pathlib.Path(tmp) / "short.sbpt"
+    short.write_bytes(POINT_FILE_MAGIC)
+    expect_value_error("is not a point file", PointCloud.load, short)
+
+    future = pathlib.Path(tmp) / "future.sbpt"
+    future.write_bytes(_point_file_header.pack(POINT_FILE_MAGIC, 99, 3, 0))
+    expect_value_error("unsupported point file version 99", PointCloud.load, future)
+    expect_value_error("unsupported point file version 99", first.append_to, future)
+
+    truncated = pathlib.Path(tmp) / "truncated.sbpt"
+    truncated.write_bytes(path.read_bytes()[:-8])
+    expect_value_error("is truncated, expected 5 points of 3 dimensions", PointCloud.load, truncated)
+
+print("point files survive save, append_to and load and broken headers are rejected")